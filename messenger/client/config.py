@@ -1,3 +1,12 @@
 SERVER_HOST = "192.168.0.51"  # IP адрес сервера
 SERVER_PORT = 8000
-SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
\ No newline at end of file
+SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
+
+# Таймауты HTTP-запросов (подключение, чтение) в секундах: недоступный
+# сервер обнаруживается за 2 секунды, а не за полный таймаут чтения
+REQUEST_TIMEOUT = (2, 10)
+
+# Интервалы запасного опроса статусов (мс): редкий, пока WebSocket доставляет
+# изменения сам, и прежний частый, пока соединения нет
+POLL_INTERVAL_CONNECTED = 60000
+POLL_INTERVAL_DISCONNECTED = 10000
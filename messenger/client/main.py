@@ -1,31 +1,41 @@
 import sys
-import requests
-from PyQt5.QtWidgets import QApplication, QMessageBox
-#from ui.login_dialog import LoginDialog  # Убрали client.
-#from ui.main_window import MainWindow    # Убрали client.
-from ui.login_dialog import LoginDialog
-from ui.main_window import MainWindow
+import logging
 
 class MessengerClient:
     def __init__(self):
+        # Qt и окна импортируются только при запуске клиента, а не при импорте модуля
+        from PyQt5.QtWidgets import QApplication
         self.app = QApplication(sys.argv)
         self.auth_token = None
         self.current_user = None
         
     def run(self):
+        from ui.login_dialog import LoginDialog
+
         # Show login dialog
         login_dialog = LoginDialog()
         if login_dialog.exec_():
             self.auth_token = login_dialog.auth_token
             self.current_user = login_dialog.current_user
             
-            # Show main window
+            # Show main window (чат, websockets и asyncio грузятся только после входа)
+            from ui.main_window import MainWindow
             main_window = MainWindow(self.auth_token, self.current_user)
             main_window.show()
             
-            return self.app.exec_()
+            exit_code = self.app.exec_()
+            
+            # Окно уже закрыто, но запрос /auth/logout из closeEvent может ещё
+            # выполняться в пуле потоков. Ждём его явно, пока интерпретатор не начал
+            # завершаться: timeout=2 у запроса - это до 2 с на подключение и 2 с на ответ
+            from PyQt5.QtCore import QThreadPool
+            QThreadPool.globalInstance().waitForDone(4000)
+            return exit_code
         return 0
 
 if __name__ == "__main__":
+    # Информационные сообщения клиента выводятся в консоль как раньше,
+    # отладочные (каждый кадр WebSocket) включаются уровнем DEBUG
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     client = MessengerClient()
     sys.exit(client.run())
\ No newline at end of file
@@ -2,6 +2,12 @@ from datetime import datetime
 from typing import List, Optional
 
 class Message:
+    # Сообщений в чате может быть сотни, __slots__ убирает __dict__ у каждого
+    __slots__ = (
+        "id", "sender_id", "receiver_id", "content", "timestamp", "is_read",
+        "message_type", "file_data", "attachments", "_formatted_time"
+    )
+
     def __init__(
         self,
         message_id: int,
@@ -22,6 +28,7 @@ class Message:
         self.message_type = message_type
         self.file_data = file_data  # Хранение base64 данных файла
         self.attachments = []
+        self._formatted_time = None  # Кэш строки времени для отрисовки
 
     def mark_as_read(self):
         self.is_read = True
@@ -30,7 +37,10 @@ class Message:
         self.attachments.append(attachment_path)
 
     def get_formatted_time(self) -> str:
-        return self.timestamp.strftime("%H:%M")
+        # Чат перерисовывается целиком, поэтому форматируем время один раз
+        if self._formatted_time is None:
+            self._formatted_time = self.timestamp.strftime("%H:%M")
+        return self._formatted_time
 
     def is_outgoing(self, current_user_id: int) -> bool:
         return self.sender_id == current_user_id
@@ -0,0 +1,85 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+
+    def read_json(response):
+        """Разбирает JSON-ответ сервера"""
+        return orjson.loads(response.content)
+except ImportError:  # orjson не установлен - разбирает сам requests
+    def read_json(response):
+        """Разбирает JSON-ответ сервера"""
+        return response.json()
+
+class ThreadLocalSession:
+    """HTTP-сессия клиента: у каждого потока своя requests.Session"""
+    # Все запросы идут на один сервер, поэтому TCP-соединения переиспользуются
+    # (keep-alive) вместо нового на каждый запрос. Запросы идут одновременно из
+    # потока интерфейса, пула QThreadPool и пула asyncio, а requests не
+    # гарантирует потокобезопасность Session - поэтому сессия на поток
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    # Сессия выбирается в момент вызова, поэтому http.post можно передать
+    # в фоновую задачу: запрос уйдёт через сессию потока, который его выполняет
+    def get(self, url, **kwargs):
+        return self.session().get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session().post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.session().put(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session().delete(url, **kwargs)
+
+http = ThreadLocalSession()
+
+class WorkerSignals(QObject):
+    """Сигналы фоновой задачи, доставляются в поток интерфейса"""
+    finished = pyqtSignal(object)  # Результат функции
+    error = pyqtSignal(object)     # Исключение, возникшее в функции
+
+class NetworkWorker(QRunnable):
+    """Выполняет блокирующий сетевой запрос в пуле потоков Qt"""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+def run_in_background(fn, *args, on_finished=None, on_error=None, **kwargs):
+    """Запускает fn(*args, **kwargs) в фоне, обработчики вызываются в потоке интерфейса"""
+    worker = NetworkWorker(fn, *args, **kwargs)
+    if on_finished:
+        worker.signals.finished.connect(on_finished)
+    if on_error:
+        worker.signals.error.connect(on_error)
+    QThreadPool.globalInstance().start(worker)
+    return worker
@@ -9,8 +9,10 @@ import base64
 import tempfile
 from datetime import datetime
 from models.message import Message
-from config import SERVER_URL
-from websocket_client import MessengerWebSocket
+from config import (SERVER_URL, REQUEST_TIMEOUT,
+                    POLL_INTERVAL_CONNECTED, POLL_INTERVAL_DISCONNECTED)
+from websocket_client import get_websocket_instance
+from network import http, read_json
 class ChatWidget(QWidget):
     # Добавляем сигнал для обновления статуса
     status_updated = pyqtSignal(dict)
@@ -23,28 +25,45 @@ class ChatWidget(QWidget):
         self.contact_label = None  # Сохраняем ссылку на label
         self.messages = []
         self.temp_files = []
+        self.image_files = {}  # message_id -> путь к временному файлу изображения
         self.init_ui()
-        self.load_messages()
+        # История загружается после показа вкладки, а не в конструкторе
+        QTimer.singleShot(0, self.load_messages)
         
         # Timer for periodic updates
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.check_new_messages)
         self.update_timer.start(5000)  # Check every 5 seconds
         
-        # Timer для обновления статуса
+        # Timer для обновления статуса. Изменения статуса приходят через WebSocket,
+        # опрос подстраховывает и учащается, пока соединения нет
         self.status_timer = QTimer()
         self.status_timer.timeout.connect(self.update_contact_status)
-        self.status_timer.start(10000)  # Обновлять статус каждые 10 секунд
+        self.status_timer.start(POLL_INTERVAL_DISCONNECTED)
         
-        self.websocket = MessengerWebSocket(current_user["id"])
-        self.websocket.message_received.connect(self.handle_websocket_message)
-        self.websocket.connect()
+        # Соединение общее для всех открытых чатов пользователя
+        self.websocket = None
+        self.subscribe_websocket()
         
         # Подключаем сигнал
         self.status_updated.connect(self.on_status_updated)
 
+    def subscribe_websocket(self):
+        """Подписка на общее WebSocket-соединение, в том числе повторная после его остановки"""
+        self.websocket = get_websocket_instance(self.current_user["id"], self.auth_token)
+        self.websocket.message_received.connect(self.handle_websocket_message)
         # Подключаем сигнал обновления статуса из WebSocket
         self.websocket.status_updated.connect(self.handle_status_update)
+        self.websocket.connection_changed.connect(self.on_websocket_connection_changed)
+        # Если соединение сдастся после серии неудачных переподключений,
+        # берём из реестра новое
+        self.websocket.stopped.connect(self.subscribe_websocket)
+        self.on_websocket_connection_changed(self.websocket.is_connected)
+
+    def on_websocket_connection_changed(self, connected):
+        self.status_timer.setInterval(
+            POLL_INTERVAL_CONNECTED if connected else POLL_INTERVAL_DISCONNECTED
+        )
 
     def handle_status_update(self, status_data):
         """Обработка уведомления об изменении статуса"""
@@ -86,7 +105,7 @@ class ChatWidget(QWidget):
         
         try:
             headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.delete(
+            response = http.delete(
                 f"{SERVER_URL}/messages/{message_id}", 
                 headers=headers,
                 timeout=5
@@ -105,8 +124,7 @@ class ChatWidget(QWidget):
                     notification = {
                         "type": "message_deleted", 
                         "message_id": message_id,
-                        "deleted_by": self.current_user["id"],
-                        "timestamp": datetime.now().isoformat()
+                        "deleted_by": self.current_user["id"]
                     }
                     print(f"🔧 Sending WebSocket notification: {notification}")
                     self.websocket.send_message(notification)
@@ -181,10 +199,10 @@ class ChatWidget(QWidget):
                     "file_data": file_data
                 }
                 
-                response = requests.post(f"{SERVER_URL}/messages", json=payload, headers=headers)
+                response = http.post(f"{SERVER_URL}/messages", json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
                 
                 if response.status_code == 200:
-                    message_data = response.json()
+                    message_data = read_json(response)
                     # Убедимся, что file_data сохраняется в объекте сообщения
                     message_data["file_data"] = file_data  # Сохраняем данные файла
                     message = Message.from_dict(message_data)
@@ -210,13 +228,14 @@ class ChatWidget(QWidget):
     def load_messages(self):
         try:
             headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(
+            response = http.get(
                 f"{SERVER_URL}/messages?contact_id={self.contact['id']}",
-                headers=headers
+                headers=headers,
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code == 200:
-                messages_data = response.json()["messages"]
+                messages_data = read_json(response)["messages"]
                 self.messages = [Message.from_dict(msg) for msg in messages_data]
                 self.display_messages()
             else:
@@ -224,6 +243,8 @@ class ChatWidget(QWidget):
                 
         except requests.exceptions.ConnectionError:
             print("Cannot connect to server")
+        except requests.exceptions.Timeout:
+            print("Request timeout")
             
     def display_messages(self):
         self.messages_area.clear()
@@ -244,12 +265,16 @@ class ChatWidget(QWidget):
         # Для изображений создаем временный файл и отображаем картинку
         if message.message_type == "image" and hasattr(message, 'file_data') and message.file_data:
             try:
-                # Декодируем base64 и создаем временный файл
-                image_data = base64.b64decode(message.file_data)
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                temp_file.write(image_data)
-                temp_file.close()
-                self.temp_files.append(temp_file.name)  # Сохраняем для очистки
+                # Декодируем base64 и создаем временный файл только один раз на сообщение,
+                # при повторной отрисовке чата используем уже записанный файл
+                image_path = self.image_files.get(message.id)
+                if image_path is None:
+                    image_data = base64.b64decode(message.file_data)
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
+                        temp_file.write(image_data)
+                    image_path = temp_file.name
+                    self.image_files[message.id] = image_path
+                    self.temp_files.append(image_path)  # Сохраняем для очистки
                 
                 # Добавляем заголовок с именем отправителя и временем
                 header_html = f"""
@@ -263,7 +288,7 @@ class ChatWidget(QWidget):
                 
                 # Добавляем изображение в текст
                 image_format = QTextImageFormat()
-                image_format.setName(temp_file.name)
+                image_format.setName(image_path)
                 image_format.setWidth(200)  # Ограничиваем ширину
                 cursor.insertImage(image_format)
                 
@@ -330,11 +355,11 @@ class ChatWidget(QWidget):
             print(f"🔧 Debug - Payload: {payload}")
             print(f"🔧 Debug - Contact ID: {self.contact['id']}")
             
-            response = requests.post(
+            response = http.post(
                 f"{SERVER_URL}/messages",
                 json=payload,
                 headers=headers,
-                timeout=10
+                timeout=REQUEST_TIMEOUT
             )
             
             print(f"🔧 Debug - Response Status: {response.status_code}")
@@ -342,7 +367,7 @@ class ChatWidget(QWidget):
             
             if response.status_code == 200:
                 self.message_input.clear()
-                message_data = response.json()
+                message_data = read_json(response)
                 message = Message.from_dict(message_data)
                 self.messages.append(message)
                 self.add_message_to_display(message)
@@ -352,7 +377,7 @@ class ChatWidget(QWidget):
                 print(f"❌ Response: {response.text}")
                 
                 try:
-                    error_detail = response.json().get("detail", "Unknown error")
+                    error_detail = read_json(response).get("detail", "Unknown error")
                     QMessageBox.warning(self, "Error", f"Failed to send message: {error_detail}")
                 except:
                     QMessageBox.warning(self, "Error", f"Failed to send message. Status: {response.status_code}")
@@ -365,32 +390,23 @@ class ChatWidget(QWidget):
 
     def update_status_display(self):
         """Обновление отображения статуса контакта"""
-        # Очищаем layout
-        while self.contact_layout.count():
-            item = self.contact_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        # Создаем новый label с актуальным статусом
+        # Формируем текст с актуальным статусом
         status_icon = "🟢" if self.contact.get("is_online", False) else "⚫"
         last_seen_text = ""
         
         # Добавляем время последней активности, если есть
         if self.contact.get("last_seen"):
             try:
-                from datetime import datetime
                 last_seen = datetime.fromisoformat(self.contact["last_seen"])
-                now = datetime.now()
-                diff = now - last_seen
+                # Разницу считаем один раз в целых секундах
+                seconds = int((datetime.now() - last_seen).total_seconds())
                 
-                if diff.days > 0:
-                    last_seen_text = f" (был {diff.days} д. назад)"
-                elif diff.seconds > 3600:
-                    hours = diff.seconds // 3600
-                    last_seen_text = f" (был {hours} ч. назад)"
-                elif diff.seconds > 60:
-                    minutes = diff.seconds // 60
-                    last_seen_text = f" (был {minutes} мин. назад)"
+                if seconds >= 86400:
+                    last_seen_text = f" (был {seconds // 86400} д. назад)"
+                elif seconds > 3600:
+                    last_seen_text = f" (был {seconds // 3600} ч. назад)"
+                elif seconds > 60:
+                    last_seen_text = f" (был {seconds // 60} мин. назад)"
                 else:
                     last_seen_text = " (только что)"
             except:
@@ -399,8 +415,12 @@ class ChatWidget(QWidget):
         username = self.contact.get("username", "Unknown")
         status_text = f"{status_icon} {username}{last_seen_text}"
         
-        self.contact_label = QLabel(status_text)
-        self.contact_layout.addWidget(self.contact_label)
+        # Label создаётся один раз, дальше меняем текст только если он изменился
+        if self.contact_label is None:
+            self.contact_label = QLabel(status_text)
+            self.contact_layout.addWidget(self.contact_label)
+        elif self.contact_label.text() != status_text:
+            self.contact_label.setText(status_text)
     
     def on_status_updated(self, updated_contact):
         """Обработчик сигнала обновления статуса"""
@@ -414,7 +434,9 @@ class ChatWidget(QWidget):
                 tab_index = parent.indexOf(self)
                 if tab_index >= 0:
                     status_icon = "🟢" if updated_contact.get("is_online", False) else "⚫"
-                    parent.setTabText(tab_index, f"{status_icon} {updated_contact['username']}")
+                    tab_text = f"{status_icon} {updated_contact['username']}"
+                    if parent.tabText(tab_index) != tab_text:
+                        parent.setTabText(tab_index, tab_text)
                     
         except Exception as e:
             print(f"⚠️ Error updating status display: {e}")
@@ -423,39 +445,41 @@ class ChatWidget(QWidget):
     def check_new_messages(self):
         try:
             headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(
+            response = http.get(
                 f"{SERVER_URL}/messages/unread",
-                headers=headers
+                headers=headers,
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code == 200:
-                unread_messages = response.json()["messages"]
+                unread_messages = read_json(response)["messages"]
                 for msg_data in unread_messages:
                     message = Message.from_dict(msg_data)
                     if message.sender_id == self.contact["id"]:
                         self.messages.append(message)
                         self.add_message_to_display(message)
                         # Mark as read
-                        requests.put(
+                        http.put(
                             f"{SERVER_URL}/messages/{message.id}/read",
-                            headers=headers
+                            headers=headers,
+                            timeout=REQUEST_TIMEOUT
                         )
                         
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             pass
             
     def update_contact_status(self):
         """Обновление информации о контакте с сервера"""
         try:
             headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(
+            response = http.get(
                 f"{SERVER_URL}/users/{self.contact['id']}",
                 headers=headers,
                 timeout=5
             )
             
             if response.status_code == 200:
-                updated_contact = response.json()
+                updated_contact = read_json(response)
                 
                 # Проверяем, изменился ли статус
                 old_status = self.contact.get("is_online", False)
@@ -479,6 +503,10 @@ class ChatWidget(QWidget):
             print(f"⚠️ Error updating contact status: {e}")
     
     def closeEvent(self, event):
+        # Останавливаем опрос сервера для закрытой вкладки
+        self.update_timer.stop()
+        self.status_timer.stop()
+        
         # Очищаем временные файлы при закрытии
         for temp_file in self.temp_files:
             try:
@@ -1,8 +1,16 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QMessageBox, QInputDialog)
-from PyQt5.QtCore import Qt
+                             QLineEdit, QPushButton, QMessageBox)
+import logging
 import requests
-from config import SERVER_URL
+from config import SERVER_URL, REQUEST_TIMEOUT
+from network import http, read_json, run_in_background
+
+# Адреса не меняются во время работы клиента, собираем их один раз
+LOGIN_URL = f"{SERVER_URL}/auth/login"
+REGISTER_URL = f"{SERVER_URL}/auth/register"
+CURRENT_USER_URL = f"{SERVER_URL}/users/me"
+
+logger = logging.getLogger(__name__)
 
 class LoginDialog(QDialog):
     def __init__(self):
@@ -42,93 +50,136 @@ class LoginDialog(QDialog):
         self.login_btn.clicked.connect(self.login)
         self.register_btn.clicked.connect(self.register)
         
+    def set_busy(self, busy):
+        """Блокирует форму, пока запрос выполняется в фоне"""
+        for widget in (self.username_edit, self.password_edit, self.login_btn, self.register_btn):
+            widget.setEnabled(not busy)
+    
+    def validate_input(self, username, password):
+        """Проверяет поля до отправки запроса, все ошибки показываются одним окном"""
+        errors = []
+        if not username.strip():
+            errors.append("Username is required")
+        if not password:
+            errors.append("Password is required")
+        if errors:
+            QMessageBox.warning(self, "Error", "\n".join(errors))
+            return False
+        return True
+    
     def login(self):  # ЭТОТ МЕТОД ДОЛЖЕН БЫТЬ!
         username = self.username_edit.text()
         password = self.password_edit.text()
+        if not self.validate_input(username, password):
+            return
         
-        print(f"Trying to login: {username}")  # Debug
+        logger.debug("Trying to login: %s", username)
         
-        try:
-            response = requests.post(
-                f"{SERVER_URL}/auth/login",
-                json={"username": username, "password": password},
-                timeout=10
-            )
+        # Сетевые запросы выполняются в фоне, окно не зависает на время timeout
+        self.set_busy(True)
+        run_in_background(
+            self.login_request, username, password,
+            on_finished=self.on_login_finished,
+            on_error=self.on_request_error
+        )
             
-            print(f"Status: {response.status_code}")  # Debug
-            print(f"Response text: {response.text}")  # Debug
+    def login_request(self, username, password):
+        """Вход и получение данных пользователя (выполняется в фоновом потоке)"""
+        response = http.post(
+            LOGIN_URL,
+            json={"username": username, "password": password},
+            timeout=REQUEST_TIMEOUT
+        )
             
-            if response.status_code == 200:
-                try:
-                    self.auth_token = response.json()["access_token"]
-                    self.current_user = self.get_current_user()
-                    self.accept()
-                except:
-                    QMessageBox.warning(self, "Error", "Invalid server response")
-            else:
-                # Пробуем получить JSON ошибки
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("detail", "Invalid credentials")
-                    QMessageBox.warning(self, "Error", error_detail)
-                except:
-                    QMessageBox.warning(self, "Error", 
-                                      f"Login failed: {response.status_code}\n"
-                                      f"Response: {response.text[:100]}...")
+        auth_token = None
+        current_user = None
+        if response.status_code == 200:
+            try:
+                data = read_json(response)
+                auth_token = data["access_token"]
+            except:
+                return response, None, None
+            # Сервер возвращает пользователя вместе с токеном, /users/me - для старых серверов
+            current_user = data.get("user") or self.get_current_user(auth_token)
+        return response, auth_token, current_user
                     
-        except requests.exceptions.ConnectionError:
-            QMessageBox.critical(self, "Error", "Cannot connect to server")
-        except requests.exceptions.Timeout:
-            QMessageBox.warning(self, "Error", "Request timeout")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Unexpected error: {str(e)}")
+    def on_login_finished(self, result):
+        self.set_busy(False)
+        response, auth_token, current_user = result
+        
+        # Тело ответа не логируем: в нём токен доступа
+        logger.debug("Login status: %s", response.status_code)
+        
+        if response.status_code == 200:
+            if auth_token is None:
+                QMessageBox.warning(self, "Error", "Invalid server response")
+                return
+            self.auth_token = auth_token
+            self.current_user = current_user
+            self.accept()
+        else:
+            self.show_error_response(response, "Invalid credentials", "Login failed")
     
     def register(self):  # И ЭТОТ МЕТОД ТОЖЕ ДОЛЖЕН БЫТЬ!
         username = self.username_edit.text()
         password = self.password_edit.text()
+        if not self.validate_input(username, password):
+            return
+        
+        logger.debug("Trying to register: %s", username)
         
-        print(f"Trying to register: {username}")  # Debug
+        self.set_busy(True)
+        run_in_background(
+            http.post,
+            REGISTER_URL,
+            json={"username": username, "password": password},
+            timeout=REQUEST_TIMEOUT,
+            on_finished=self.on_register_finished,
+            on_error=self.on_request_error
+        )
+    
+    def on_register_finished(self, response):
+        self.set_busy(False)
         
+        logger.debug("Register status: %s", response.status_code)
+        
+        if response.status_code == 200:
+            QMessageBox.information(self, "Success", "Registration successful")
+        else:
+            self.show_error_response(response, "Unknown error", "Server error")
+    
+    def show_error_response(self, response, default_detail, fail_label):
+        """Показывает ошибку из ответа сервера"""
+        # Пробуем получить JSON ошибки, если доступен
         try:
-            response = requests.post(
-                f"{SERVER_URL}/auth/register",
-                json={"username": username, "password": password},
-                timeout=10
-            )
-            
-            print(f"Status: {response.status_code}")  # Debug
-            print(f"Response text: {response.text}")  # Debug
+            error_detail = read_json(response).get("detail", default_detail)
+        except:
+            error_detail = None
+        if not isinstance(error_detail, str):
+            # Если не JSON, показываем сырой текст ответа
+            error_detail = (f"{fail_label}: {response.status_code}\n"
+                            f"Response: {response.text[:100]}...")
+        QMessageBox.warning(self, "Error", error_detail)
             
-            if response.status_code == 200:
-                QMessageBox.information(self, "Success", "Registration successful")
-            else:
-                # Пробуем получить JSON ошибки, если доступен
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("detail", "Unknown error")
-                    QMessageBox.warning(self, "Error", error_detail)
-                except:
-                    # Если не JSON, показываем сырой текст ответа
-                    QMessageBox.warning(self, "Error", 
-                                      f"Server error: {response.status_code}\n"
-                                      f"Response: {response.text[:100]}...")
-                    
-        except requests.exceptions.ConnectionError:
+    def on_request_error(self, error):
+        """Ошибка сетевого запроса из фонового потока"""
+        self.set_busy(False)
+        if isinstance(error, requests.exceptions.ConnectionError):
             QMessageBox.critical(self, "Error", "Cannot connect to server")
-        except requests.exceptions.Timeout:
+        elif isinstance(error, requests.exceptions.Timeout):
             QMessageBox.warning(self, "Error", "Request timeout")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Unexpected error: {str(e)}")
+        else:
+            QMessageBox.critical(self, "Error", f"Unexpected error: {str(error)}")
     
-    def get_current_user(self):
+    def get_current_user(self, auth_token):
         try:
-            headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(f"{SERVER_URL}/users/me", headers=headers, timeout=10)
+            headers = {"Authorization": f"Bearer {auth_token}"}
+            response = http.get(CURRENT_USER_URL, headers=headers, timeout=REQUEST_TIMEOUT)
             
             if response.status_code == 200:
-                return response.json()
+                return read_json(response)
             else:
-                print(f"Failed to get user info: {response.status_code}")
+                logger.warning("Failed to get user info: %s", response.status_code)
                 return None
         except:
-            return None
\ No newline at end of file
+            return None
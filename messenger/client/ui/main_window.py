@@ -4,8 +4,11 @@ from PyQt5.QtWidgets import (QMainWindow, QSplitter, QTabWidget, QListWidget,
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QIcon
 from ui.chat_widget import ChatWidget
+from websocket_client import get_websocket_instance, remove_websocket_instance
+from network import http, read_json, run_in_background
 import requests
-from config import SERVER_URL
+from config import (SERVER_URL, REQUEST_TIMEOUT,
+                    POLL_INTERVAL_CONNECTED, POLL_INTERVAL_DISCONNECTED)
 
 class MainWindow(QMainWindow):
     connection_status_changed = pyqtSignal(bool)
@@ -14,40 +17,57 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.auth_token = auth_token
         self.current_user = current_user
+        # Заголовок авторизации не меняется за время жизни окна
+        self.auth_headers = {"Authorization": f"Bearer {auth_token}"}
         self.contacts = []
+        self._visible_contacts = []  # Контакты в порядке строк списка на экране
+        self._open_tabs_by_uid = {}  # id контакта -> открытая вкладка ChatWidget
+        self._contacts_loading = False  # Идёт фоновый запрос списка контактов
+        self._logout_sent = False  # Запрос /auth/logout уже отправлен
         self.init_ui()
-        self.load_contacts()
         
-        # Таймер для автообновления
+        # Отложенная перерисовка списка: серия обновлений подряд
+        # (несколько статусов, опрос) даёт одну перерисовку
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(150)
+        self._refresh_timer.timeout.connect(self._do_update_contacts_list)
+        
+        # Загружаем контакты после первой отрисовки окна, а не в конструкторе
+        QTimer.singleShot(0, self.load_contacts)
+        
+        # Опрос сервера остаётся запасным вариантом: новые пользователи
+        # и обновления, пропущенные во время переподключения WebSocket.
+        # Пока соединения нет, опрашиваем с прежней частотой
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_contacts)
-        self.update_timer.start(10000)  # Обновлять каждые 10 секунд
+        self.update_timer.start(POLL_INTERVAL_DISCONNECTED)
+        
+        # Статусы контактов приходят через WebSocket сразу при изменении
+        self.websocket = None
+        self.subscribe_websocket()
+
+    def subscribe_websocket(self):
+        """Подписка на общее WebSocket-соединение, в том числе повторная после его остановки"""
+        self.websocket = get_websocket_instance(self.current_user["id"], self.auth_token)
+        self.websocket.status_updated.connect(self.on_status_update)
+        self.websocket.connection_changed.connect(self.on_websocket_connection_changed)
+        self.websocket.stopped.connect(self.subscribe_websocket)
+        self.update_timer.setInterval(
+            POLL_INTERVAL_CONNECTED if self.websocket.is_connected else POLL_INTERVAL_DISCONNECTED
+        )
+
+    def on_websocket_connection_changed(self, connected):
+        if connected:
+            self.update_timer.setInterval(POLL_INTERVAL_CONNECTED)
+            # Статусы, изменившиеся пока соединения не было, забираем сразу
+            self.update_contacts()
+        else:
+            self.update_timer.setInterval(POLL_INTERVAL_DISCONNECTED)
 
     def update_contacts(self):
         """Обновление списка контактов"""
-        try:
-            headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(f"{SERVER_URL}/users", headers=headers)
-            
-            if response.status_code == 200:
-                updated_contacts = response.json()
-                
-                # Обновляем основной список контактов
-                self.contacts = updated_contacts
-                
-                # Обновляем отображение в списке
-                self.contacts_list.clear()
-                for user in self.contacts:
-                    status_icon = "🟢" if user["is_online"] else "⚫"
-                    self.contacts_list.addItem(f"{status_icon} {user['username']}")
-                
-                self.statusBar().showMessage("Contacts updated")
-            else:
-                QMessageBox.warning(self, "Error", "Failed to load contacts")
-                
-        except requests.exceptions.ConnectionError:
-            self.statusBar().showMessage("Disconnected")
-            QMessageBox.critical(self, "Error", "Cannot connect to server")
+        self.load_contacts(on_finished=self.on_contacts_updated)
     
     def init_ui(self):
         self.setWindowTitle("Local Messenger")
@@ -63,7 +83,11 @@ class MainWindow(QMainWindow):
         
         # Contacts list
         self.contacts_list = QListWidget()
-        self.contacts_list.currentRowChanged.connect(self.on_contact_selected)
+        # Чат открывается по щелчку (или Enter), а не по смене текущей строки:
+        # выделение сохраняется между обновлениями, и щелчок по уже выделенному
+        # контакту должен снова показать его вкладку
+        self.contacts_list.clicked.connect(self.on_contact_index_activated)
+        self.contacts_list.activated.connect(self.on_contact_index_activated)
         splitter.addWidget(self.contacts_list)
         
         # Chat area
@@ -105,104 +129,177 @@ class MainWindow(QMainWindow):
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
         
-    def load_contacts(self):
-        try:
-            headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.get(f"{SERVER_URL}/users", headers=headers)
-            
-            if response.status_code == 200:
-                self.contacts = response.json()
-                self.contacts_list.clear()
-                for user in self.contacts:
-                    # УБРАНА ПРОВЕРКА - теперь видим всех пользователей включая себя
-                    status_icon = "🟢" if user["is_online"] else "⚫"
-                    self.contacts_list.addItem(f"{status_icon} {user['username']}")
-            else:
-                QMessageBox.warning(self, "Error", "Failed to load contacts")
-                
-        except requests.exceptions.ConnectionError:
+    def load_contacts(self, on_finished=None):
+        # Запрос выполняется в фоне; пока он не завершён, новый не отправляем
+        if self._contacts_loading:
+            return
+        self._contacts_loading = True
+        run_in_background(
+            self.fetch_contacts,
+            on_finished=on_finished or self.on_contacts_loaded,
+            on_error=self.on_contacts_error
+        )
+        
+    def fetch_contacts(self):
+        """Запрос списка контактов (выполняется в фоновом потоке)"""
+        response = http.get(f"{SERVER_URL}/users", headers=self.auth_headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        return read_json(response)
+        
+    def on_contacts_loaded(self, contacts):
+        self._contacts_loading = False
+        if contacts is None:
+            QMessageBox.warning(self, "Error", "Failed to load contacts")
+            return False
+        self.contacts = contacts
+        self.update_contacts_list()
+        return True
+        
+    def on_contacts_updated(self, contacts):
+        if self.on_contacts_loaded(contacts):
+            self.statusBar().showMessage("Contacts updated")
+        
+    def on_contacts_error(self, error):
+        self._contacts_loading = False
+        if isinstance(error, requests.exceptions.ConnectionError):
             self.statusBar().showMessage("Disconnected")
             QMessageBox.critical(self, "Error", "Cannot connect to server")
+        elif isinstance(error, requests.exceptions.Timeout):
+            self.statusBar().showMessage("Request timeout")
+        else:
+            print(f"⚠️ Error loading contacts: {error}")
+            
+    def update_contacts_list(self):
+        """Запланировать перерисовку списка контактов"""
+        # Повторный start() лишь переносит срабатывание таймера
+        self._refresh_timer.start()
+        
+    def _do_update_contacts_list(self):
+        """Отображение списка контактов"""
+        texts = []
+        for user in self.contacts:
+            # УБРАНА ПРОВЕРКА - теперь видим всех пользователей включая себя
+            status_icon = "🟢" if user["is_online"] else "⚫"
+            texts.append(f"{status_icon} {user['username']}")
+        # Выбор строки ищет контакт именно в том списке, который отрисован
+        self._visible_contacts = list(self.contacts)
+        
+        # Меняем только изменившиеся строки вместо clear() и полной пересборки,
+        # поэтому выделение и прокрутка списка сохраняются
+        for row, text in enumerate(texts):
+            item = self.contacts_list.item(row)
+            if item is None:
+                self.contacts_list.addItem(text)
+            elif item.text() != text:
+                item.setText(text)
+        while self.contacts_list.count() > len(texts):
+            self.contacts_list.takeItem(self.contacts_list.count() - 1)
+            
+    def on_status_update(self, status_data):
+        """Изменение статуса контакта, присланное сервером через WebSocket"""
+        user_id = status_data.get("user_id")
+        is_online = status_data.get("is_online", False)
+        for user in self.contacts:
+            if user["id"] == user_id:
+                user["is_online"] = is_online
+                user["status"] = "online" if is_online else "offline"
+                self.update_contacts_list()
+                return
+        # Неизвестный пользователь (например, только что зарегистрированный)
+        self.update_contacts()
+            
+    def on_contact_index_activated(self, index):
+        self.on_contact_selected(index.row())
             
     def on_contact_selected(self, row):
-        if row >= 0 and row < len(self.contacts):
-            contact = self.contacts[row]
-            self.open_chat(contact)
+        if 0 <= row < len(self._visible_contacts):
+            self.open_chat(self._visible_contacts[row])
             
     def open_chat(self, contact):
         print(f"🔧 Opening chat with: {contact['username']} (ID: {contact['id']})")
         
         # Check if chat already open
-        for i in range(self.chat_tabs.count()):
-            if self.chat_tabs.widget(i).contact["id"] == contact["id"]:
-                self.chat_tabs.setCurrentIndex(i)
-                return
+        chat_widget = self._open_tabs_by_uid.get(contact["id"])
+        if chat_widget is not None:
+            self.chat_tabs.setCurrentWidget(chat_widget)
+            return
         
         # Create new chat tab
         chat_widget = ChatWidget(self.auth_token, self.current_user, contact)
+        self._open_tabs_by_uid[contact["id"]] = chat_widget
         self.chat_tabs.addTab(chat_widget, contact["username"])
-        self.chat_tabs.setCurrentIndex(self.chat_tabs.count() - 1)
+        self.chat_tabs.setCurrentWidget(chat_widget)
         
     def close_chat_tab(self, index):
+        chat_widget = self.chat_tabs.widget(index)
         self.chat_tabs.removeTab(index)
+        self._open_tabs_by_uid.pop(chat_widget.contact["id"], None)
+        # removeTab не удаляет виджет: закрываем его, чтобы остановить опрос сервера
+        chat_widget.close()
+        chat_widget.deleteLater()
         
     def logout(self):
         """Выход из системы с обновлением статуса"""
-        try:
-            headers = {"Authorization": f"Bearer {self.auth_token}"}
-            
-            # Отправляем запрос на выход
-            response = requests.post(
-                f"{SERVER_URL}/auth/logout",
-                headers=headers,
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                print(f"✅ User {self.current_user['id']} logged out successfully")
-            else:
-                print(f"⚠️ Logout API error: {response.status_code}")
-                
-        except requests.exceptions.ConnectionError:
+        if self._logout_sent:
+            return
+        self._logout_sent = True
+        
+        # Отправляем запрос на выход в фоне, окно закрывается по его завершении
+        run_in_background(
+            http.post,
+            f"{SERVER_URL}/auth/logout",
+            headers=self.auth_headers,
+            timeout=5,
+            on_finished=self.on_logout_finished,
+            on_error=self.on_logout_error
+        )
+        
+    def on_logout_finished(self, response):
+        if response.status_code == 200:
+            print(f"✅ User {self.current_user['id']} logged out successfully")
+        else:
+            print(f"⚠️ Logout API error: {response.status_code}")
+        self.finish_logout()
+        
+    def on_logout_error(self, error):
+        if isinstance(error, requests.exceptions.ConnectionError):
             print("⚠️ Cannot connect to server during logout")
-        except Exception as e:
-            print(f"⚠️ Logout error: {e}")
-        finally:
-            # Закрываем все WebSocket соединения в чатах
-            for i in range(self.chat_tabs.count()):
-                chat_widget = self.chat_tabs.widget(i)
-                if hasattr(chat_widget, 'websocket'):
-                    try:
-                        chat_widget.websocket.disconnect()
-                    except:
-                        pass
-            
-            # Закрываем окно
-            self.close()
+        else:
+            print(f"⚠️ Logout error: {error}")
+        self.finish_logout()
+        
+    def finish_logout(self):
+        # Закрываем общее WebSocket соединение чатов
+        try:
+            remove_websocket_instance(self.current_user["id"])
+        except:
+            pass
+        
+        # Закрываем окно
+        self.close()
         
     def show_about(self):
         QMessageBox.about(self, "About", "Local Messenger v1.0 FORK by Malinevskiy Egor\nA simple local messaging application\n meow miaw :D")
         
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
-        try:
-            # Пытаемся отправить запрос на выход при закрытии
-            headers = {"Authorization": f"Bearer {self.auth_token}"}
-            response = requests.post(
+        # После logout() запрос уже отправлен, повторять его не нужно
+        if not self._logout_sent:
+            self._logout_sent = True
+            # Запрос на выход уходит в фоне, окно закрывается сразу.
+            # Результат не нужен, ошибки при закрытии игнорируем
+            run_in_background(
+                http.post,
                 f"{SERVER_URL}/auth/logout",
-                headers=headers,
+                headers=self.auth_headers,
                 timeout=2
             )
+        
+        # Закрываем общее WebSocket соединение чатов
+        try:
+            remove_websocket_instance(self.current_user["id"])
         except:
-            pass  # Игнорируем ошибки при закрытии
-        
-        # Закрываем все WebSocket соединения
-        for i in range(self.chat_tabs.count()):
-            chat_widget = self.chat_tabs.widget(i)
-            if hasattr(chat_widget, 'websocket'):
-                try:
-                    chat_widget.websocket.disconnect()
-                except:
-                    pass
+            pass
         
         event.accept()
\ No newline at end of file
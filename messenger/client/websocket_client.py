@@ -1,18 +1,39 @@
 import websockets
-import json
 import asyncio
-from threading import Thread
+import logging
+import weakref
+from functools import partial
+from threading import Lock, Thread
 from PyQt5.QtCore import QObject, pyqtSignal
-import requests
+from network import http
 from config import SERVER_HOST, SERVER_PORT
 
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def json_dumps(data):
+        # Сервер читает текстовые кадры (receive_text), поэтому отправляем str
+        return orjson.dumps(data).decode("utf-8")
+except ImportError:  # orjson не установлен - используем стандартный json
+    import json
+    json_loads = json.loads
+    json_dumps = json.dumps
+    JSONDecodeError = json.JSONDecodeError
+
+logger = logging.getLogger(__name__)
+
 class MessengerWebSocket(QObject):
     message_received = pyqtSignal(dict)  # Сигнал для передачи сообщений в UI
     status_updated = pyqtSignal(dict)    # Сигнал для обновления статусов
+    stopped = pyqtSignal()               # Слушатель завершился, исчерпав попытки переподключения
+    connection_changed = pyqtSignal(bool)  # Соединение установлено / потеряно
     
-    def __init__(self, user_id):
+    def __init__(self, user_id, auth_token):
         super().__init__()
         self.user_id = user_id
+        self.auth_token = auth_token
         self.ws = None
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
@@ -20,7 +41,14 @@ class MessengerWebSocket(QObject):
         self.running = True
         self.server_host = SERVER_HOST
         self.server_port = SERVER_PORT
+        # Адреса не меняются за время жизни объекта, собираем их один раз
+        self.ws_uri = f"ws://{self.server_host}:{self.server_port}/ws/{self.user_id}"
+        self.status_url = f"http://{self.server_host}:{self.server_port}/auth/status"
         self.loop = None
+        # Обработчики по типу сообщения, остальные типы уходят в message_received
+        self._handlers = {
+            "user_status_update": self.status_updated.emit,
+        }
 
     def connect(self):
         """Запускает WebSocket в отдельном потоке"""
@@ -30,10 +58,17 @@ class MessengerWebSocket(QObject):
                 asyncio.set_event_loop(self.loop)
                 self.loop.run_until_complete(self._websocket_listener())
             except Exception as e:
-                print(f"⚠️ WebSocket thread error: {e}")
+                logger.warning("⚠️ WebSocket thread error: %s", e)
             finally:
                 if self.loop and not self.loop.is_closed():
                     self.loop.close()
+                # Слушатель завершился сам, а не через disconnect(): помечаем объект
+                # остановленным, чтобы реестр выдал вместо него новый, и сообщаем
+                # владельцам, что нужно подписаться заново
+                if self.running:
+                    self.running = False
+                    self._set_connected(False)
+                    self.stopped.emit()
         
         thread = Thread(target=websocket_thread, daemon=True)
         thread.start()
@@ -42,75 +77,86 @@ class MessengerWebSocket(QObject):
         """Основной цикл WebSocket"""
         while self.running and self.reconnect_attempts < self.max_reconnect_attempts:
             try:
-                ws_uri = f"ws://{self.server_host}:{self.server_port}/ws/{self.user_id}"
-                print(f"🔌 Connecting to WebSocket: {ws_uri}")
+                logger.info("🔌 Connecting to WebSocket: %s", self.ws_uri)
 
                 async with websockets.connect(
-                    ws_uri, 
+                    self.ws_uri, 
                     ping_interval=20, 
                     ping_timeout=20,
                     close_timeout=5
                 ) as websocket:
                     self.ws = websocket
-                    self.is_connected = True
+                    self._set_connected(True)
                     self.reconnect_attempts = 0
-                    print("✅ WebSocket connected successfully")
+                    logger.info("✅ WebSocket connected successfully")
                     
+                    # Соединение поддерживают ping-кадры самой библиотеки (ping_interval/ping_timeout),
+                    # оборванное соединение завершает recv() исключением ConnectionClosed
                     while self.running:
                         try:
-                            message = await asyncio.wait_for(websocket.recv(), timeout=25)
+                            message = await websocket.recv()
                             await self._handle_message(message)
-                        except asyncio.TimeoutError:
-                            # Отправляем ping для поддержания соединения
-                            try:
-                                await websocket.send('ping')
-                            except:
-                                print("⚠️ Failed to send ping")
-                                break
                         except websockets.exceptions.ConnectionClosed as e:
-                            print(f"⚠️ WebSocket connection closed: {e}")
+                            logger.warning("⚠️ WebSocket connection closed: %s", e)
                             break
                         except Exception as e:
-                            print(f"⚠️ WebSocket receive error: {e}")
+                            logger.warning("⚠️ WebSocket receive error: %s", e)
                             break
+                
+                # Соединение оборвалось, цикл попробует подключиться снова
+                self._set_connected(False)
                             
             except ConnectionRefusedError:
-                print(f"❌ Connection refused to {self.server_host}:{self.server_port}")
+                logger.error("❌ Connection refused to %s:%s", self.server_host, self.server_port)
                 await self._handle_disconnection()
             except Exception as e:
-                print(f"⚠️ WebSocket connection error: {e}")
+                logger.warning("⚠️ WebSocket connection error: %s", e)
                 await self._handle_disconnection()
         
         # После завершения цикла устанавливаем статус оффлайн
         if self.running:
-            print("📴 WebSocket listener stopped")
-            self._mark_user_offline()
+            logger.info("📴 WebSocket listener stopped")
+            await self._mark_user_offline()
+    
+    def _set_connected(self, connected):
+        """Обновляет признак соединения и сообщает UI о его изменении"""
+        if self.is_connected != connected:
+            self.is_connected = connected
+            self.connection_changed.emit(connected)
     
     async def _handle_disconnection(self):
         """Обработка разрыва соединения"""
-        self.is_connected = False
+        self._set_connected(False)
         self.reconnect_attempts += 1
         if self.reconnect_attempts < self.max_reconnect_attempts:
             delay = min(2 * self.reconnect_attempts, 10)
-            print(f"⏳ Reconnecting in {delay} seconds... (attempt {self.reconnect_attempts}/{self.max_reconnect_attempts})")
+            logger.info("⏳ Reconnecting in %s seconds... (attempt %d/%d)",
+                        delay, self.reconnect_attempts, self.max_reconnect_attempts)
             await asyncio.sleep(delay)
         else:
-            print("❌ Max reconnection attempts reached")
+            logger.error("❌ Max reconnection attempts reached")
     
-    def _mark_user_offline(self):
+    async def _mark_user_offline(self):
         """Отметить пользователя как оффлайн"""
         try:
-            response = requests.post(
-                f"http://{self.server_host}:{self.server_port}/auth/status",
-                json={"user_id": self.user_id, "is_online": False},
-                timeout=3
+            # requests блокирует поток, поэтому запрос уходит в пул потоков
+            # и не останавливает цикл событий WebSocket
+            response = await asyncio.get_running_loop().run_in_executor(
+                None,
+                partial(
+                    http.post,
+                    self.status_url,
+                    json={"user_id": self.user_id, "is_online": False},
+                    headers={"Authorization": f"Bearer {self.auth_token}"},
+                    timeout=3
+                )
             )
             if response.status_code == 200:
-                print(f"📴 Marked user {self.user_id} as offline")
+                logger.info("📴 Marked user %s as offline", self.user_id)
             else:
-                print(f"⚠️ Failed to mark user offline: {response.status_code}")
+                logger.warning("⚠️ Failed to mark user offline: %s", response.status_code)
         except Exception as e:
-            print(f"⚠️ Failed to mark user {self.user_id} as offline: {e}")
+            logger.warning("⚠️ Failed to mark user %s as offline: %s", self.user_id, e)
             
     async def _handle_message(self, message):
         """Обработка входящих сообщений"""
@@ -118,20 +164,18 @@ class MessengerWebSocket(QObject):
             if message == 'pong':
                 return
                 
-            data = json.loads(message)
-            print(f"📨 WebSocket received: {data.get('type', 'unknown')}")
+            data = json_loads(message)
+            message_type = data.get("type")
+            logger.debug("📨 WebSocket received: %s", message_type or "unknown")
             
-            # Обработка обновления статуса пользователя
-            if data.get("type") == "user_status_update":
-                self.status_updated.emit(data)
-            else:
-                # Отправляем данные в UI через сигнал
-                self.message_received.emit(data)
+            # Отправляем данные в UI через сигнал, выбранный по типу сообщения
+            handler = self._handlers.get(message_type, self.message_received.emit)
+            handler(data)
                 
-        except json.JSONDecodeError:
-            print(f"⚠️ Non-JSON message: {message}")
+        except JSONDecodeError:
+            logger.warning("⚠️ Non-JSON message: %s", message)
         except Exception as e:
-            print(f"⚠️ Error handling message: {e}")
+            logger.warning("⚠️ Error handling message: %s", e)
 
     def send_message(self, data):
         """Отправка сообщения через WebSocket"""
@@ -140,22 +184,22 @@ class MessengerWebSocket(QObject):
                 # Запускаем асинхронную отправку
                 asyncio.run_coroutine_threadsafe(self._send_async(data), self.loop)
             except Exception as e:
-                print(f"⚠️ Error in send_message: {e}")
+                logger.warning("⚠️ Error in send_message: %s", e)
         else:
-            print("⚠️ WebSocket not connected, cannot send message")
+            logger.warning("⚠️ WebSocket not connected, cannot send message")
 
     async def _send_async(self, data):
         """Асинхронная отправка сообщения"""
         try:
-            await self.ws.send(json.dumps(data))
-            print(f"📤 WebSocket sent: {data.get('type', 'unknown')}")
+            await self.ws.send(json_dumps(data))
+            logger.debug("📤 WebSocket sent: %s", data.get("type", "unknown"))
         except Exception as e:
-            print(f"⚠️ Error sending message: {e}")
-            self.is_connected = False
+            logger.warning("⚠️ Error sending message: %s", e)
+            self._set_connected(False)
 
     def disconnect(self):
         """Отключение WebSocket"""
-        print("🔌 Disconnecting WebSocket...")
+        logger.info("🔌 Disconnecting WebSocket...")
         self.running = False
         self.is_connected = False
         if self.ws:
@@ -169,6 +213,33 @@ class MessengerWebSocket(QObject):
         """Асинхронное закрытие соединения"""
         try:
             await self.ws.close()
-            print("✅ WebSocket closed properly")
+            logger.info("✅ WebSocket closed properly")
         except:
-            pass
\ No newline at end of file
+            pass
+
+
+# Одно WebSocket-соединение на пользователя, общее для всех вкладок чатов.
+# Работающий экземпляр держит сам его поток (замыкание в connect()), поэтому
+# слабые ссылки его не освобождают: соединение живёт до disconnect() или до
+# исчерпания попыток переподключения. Реестр лишь забывает остановленные
+# экземпляры, когда на них больше никто не ссылается
+_websocket_instances = weakref.WeakValueDictionary()
+_websocket_lock = Lock()
+
+def get_websocket_instance(user_id, auth_token):
+    """Возвращает WebSocket пользователя, при необходимости создаёт и подключает его"""
+    with _websocket_lock:
+        instance = _websocket_instances.get(user_id)
+        if instance is None or not instance.running:
+            instance = MessengerWebSocket(user_id, auth_token)
+            _websocket_instances[user_id] = instance
+            instance.connect()
+        return instance
+
+def remove_websocket_instance(user_id):
+    """Отключает и забывает WebSocket пользователя"""
+    with _websocket_lock:
+        instance = _websocket_instances.pop(user_id, None)
+    # Отключаемся уже без блокировки, чтобы не держать её во время сетевых операций
+    if instance is not None:
+        instance.disconnect()
@@ -1,7 +1,8 @@
 import sqlite3
 from pathlib import Path
 
-DB_PATH = Path("messenger.db")
+# Путь к базе вычисляется один раз от расположения модуля, а не от текущей папки
+DB_PATH = Path(__file__).resolve().parent.parent / "messenger.db"
 
 def get_db_connection():
     conn = sqlite3.connect(DB_PATH)
@@ -1,4 +1,3 @@
-from datetime import datetime
 from database.db import get_db_connection
 from typing import List, Optional
 
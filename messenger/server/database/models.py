@@ -1,10 +1,8 @@
 from database.db import get_db_connection
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import sqlite3
 from typing import List, Optional
 from enum import Enum
-import os, zoneinfo
 
 
 class MessageModel:
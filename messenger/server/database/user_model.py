@@ -1,6 +1,5 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from database.db import get_db_connection
-import sqlite3
 
 class UserModel:
     @staticmethod
@@ -46,6 +45,17 @@ class UserModel:
         conn.commit()
         conn.close()
 
+    @staticmethod
+    def update_password_hash(user_id: int, password_hash: str):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ?",
+            (password_hash, user_id)
+        )
+        conn.commit()
+        conn.close()
+
     @staticmethod
     def update_last_seen(user_id: int):
         """Обновление времени последней активности"""
@@ -1,11 +1,17 @@
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
+import time
 from database.user_model import UserModel
 
 security = HTTPBearer()
 SECRET_KEY = "your-secret-key-here"
 
+# last_seen пишется в БД не чаще одного раза за интервал на пользователя,
+# иначе каждый запрос клиента (опрос контактов, сообщений) делает UPDATE
+LAST_SEEN_UPDATE_INTERVAL = 15  # секунд
+_last_seen_written = {}  # user_id -> time.monotonic() последней записи
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
@@ -18,11 +24,15 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
-        # Обновляем время последней активности при каждом запросе
-        try:
-            UserModel.update_last_seen(user["id"])
-        except:
-            pass  # Игнорируем ошибки обновления last_seen
+        # Обновляем время последней активности, объединяя частые запросы в одну запись
+        now = time.monotonic()
+        last_written = _last_seen_written.get(user["id"])
+        if last_written is None or now - last_written >= LAST_SEEN_UPDATE_INTERVAL:
+            try:
+                UserModel.update_last_seen(user["id"])
+                _last_seen_written[user["id"]] = now
+            except:
+                pass  # Игнорируем ошибки обновления last_seen
         
         return user
     except jwt.ExpiredSignatureError:
@@ -8,6 +8,15 @@ from websocket_manager import manager
 import asyncio
 from database.user_model import UserModel
 
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:  # orjson не установлен - используем стандартный json
+    import json
+    json_loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
 async def check_inactive_users_periodically():
     """Периодическая проверка неактивных пользователей"""
     while True:
@@ -81,10 +90,10 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
                 else:
                     # Можно добавить обработку других сообщений
                     try:
-                        message = json.loads(data)
+                        message = json_loads(data)
                         # Здесь можно добавить логику обработки сообщений
                         pass
-                    except json.JSONDecodeError:
+                    except JSONDecodeError:
                         pass
                         
             except WebSocketDisconnect:
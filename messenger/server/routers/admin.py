@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from database.user_model import UserModel  # Измененный импорт
-from database.message_model import MessageModel  # Измененный импорт
 from dependencies import get_current_user
-from database.db import get_db_connection, init_db
+from database.db import get_db_connection
 
 router = APIRouter()
 
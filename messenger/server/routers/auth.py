@@ -4,14 +4,41 @@ from database.user_model import UserModel
 from schemas.user import UserCreate, UserLogin, UserResponse
 from passlib.context import CryptContext
 import jwt
-from dependencies import get_current_user
+from database.db import get_db_connection
+from dependencies import get_current_user, SECRET_KEY
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-SECRET_KEY = "your-secret-key-here"
+# Новые пароли хешируются Argon2id (параметры OWASP), старые bcrypt-хэши
+# по-прежнему проверяются и перехешируются при следующем успешном входе
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=65536,
+    argon2__time_cost=3,
+    argon2__parallelism=2,
+    argon2__salt_size=16,
+    argon2__digest_size=32,
+)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Хэш-заглушка проверяется, когда пользователя нет, чтобы время ответа
+# /login не выдавало, существует ли такой логин. Проверка идёт в пуле потоков
+# вместе с обработчиком /login, поэтому перебор несуществующих логинов
+# нагружает пул, но не останавливает цикл событий сервера
+_DUMMY_PASSWORD_HASH = pwd_context.hash("dummy-password")
+
+def verify_and_update_password(user_data, plain_password):
+    """Проверка пароля с перехешированием устаревшего хэша"""
+    if not user_data:
+        # Пользователя нет: проверяем хэш-заглушку, чтобы ответ занял столько же
+        # времени. Точно совпадает только с Argon2-хэшами: пока старый bcrypt-хэш
+        # не перехеширован при входе, его проверка занимает другое время
+        pwd_context.verify(plain_password, _DUMMY_PASSWORD_HASH)
+        return False
+    valid, new_hash = pwd_context.verify_and_update(plain_password, user_data["password_hash"])
+    if valid and new_hash:
+        UserModel.update_password_hash(user_data["id"], new_hash)
+    return valid
 
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -51,8 +78,11 @@ async def update_user_status(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Status update error: {str(e)}")
 
+# Хеширование и проверка Argon2 занимают ~0.2 с CPU, поэтому /register и /login
+# объявлены обычными def: FastAPI выполняет их в пуле потоков, и цикл событий
+# (WebSocket-рассылки, остальные запросы) не останавливается на время входа
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate):
+def register(user: UserCreate):
     existing_user = UserModel.get_user_by_username(user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
@@ -76,15 +106,18 @@ async def register(user: UserCreate):
     return UserResponse(**user_data)
 
 @router.post("/login")
-async def login(user: UserLogin):
+def login(user: UserLogin):
     user_data = UserModel.get_user_by_username(user.username)
-    if not user_data or not verify_password(user.password, user_data["password_hash"]):
+    # Несуществующий пользователь и неверный пароль проходят одну и ту же проверку
+    if not verify_and_update_password(user_data, user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     UserModel.update_user_status(user_data["id"], True, "online")
     
     access_token = create_access_token({"sub": user_data["username"]})
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Данные пользователя отдаём сразу, чтобы клиенту не нужен был отдельный запрос /users/me
+    user_info = UserResponse(**UserModel.get_user_by_id(user_data["id"]))
+    return {"access_token": access_token, "token_type": "bearer", "user": user_info}
 
 @router.post("/logout")
 async def logout(current_user: dict = Depends(get_current_user)):
@@ -103,12 +136,3 @@ async def logout(current_user: dict = Depends(get_current_user)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Logout error: {str(e)}")
-
-# Добавим функцию для получения соединения с БД
-def get_db_connection():
-    import sqlite3
-    from pathlib import Path
-    DB_PATH = Path("messenger.db")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
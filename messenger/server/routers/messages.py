@@ -6,7 +6,6 @@ from schemas.message import MessageCreate, MessageResponse, MessagesList
 from dependencies import get_current_user
 from websocket_manager import manager
 import logging
-import base64
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -112,7 +111,7 @@ async def delete_message(
         }
         
         await manager.broadcast_to_users(update_message, participant_ids)
-        logger.info(f"Message {message_id} deleted by user {current_user['id']}. Notified users: {participant_ids}")
+        logger.info("Message %s deleted by user %s. Notified users: %s", message_id, current_user["id"], participant_ids)
         
         return {
             "status": "success", 
@@ -123,7 +122,7 @@ async def delete_message(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting message {message_id}: {e}")
+        logger.error("Error deleting message %s: %s", message_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
     finally:
         conn.close()
\ No newline at end of file
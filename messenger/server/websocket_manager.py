@@ -1,10 +1,19 @@
 from typing import Dict, Set
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket
 import asyncio
 import logging
 from datetime import datetime
 import json
 
+try:
+    import orjson
+
+    def json_dumps(data) -> str:
+        return orjson.dumps(data).decode("utf-8")
+except ImportError:  # orjson не установлен - используем стандартный json
+    def json_dumps(data) -> str:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
@@ -17,12 +26,12 @@ class ConnectionManager:
             if user_id not in self.active_connections:
                 self.active_connections[user_id] = set()
             self.active_connections[user_id].add(websocket)
-            logger.info(f"User {user_id} connected. Total connections: {len(self.active_connections.get(user_id, set()))}")
+            logger.info("User %s connected. Total connections: %d", user_id, len(self.active_connections.get(user_id, ())))
 
             # Отправляем уведомление о новом онлайн статусе
             await self.broadcast_status_update(user_id, True)
         except Exception as e:
-            logger.error(f"Error connecting user {user_id}: {e}")
+            logger.error("Error connecting user %s: %s", user_id, e)
             raise
     
     def disconnect(self, websocket: WebSocket, user_id: int):
@@ -33,30 +42,36 @@ class ConnectionManager:
                     del self.active_connections[user_id]
                     # Отправляем уведомление об оффлайн статусе
                     asyncio.create_task(self.broadcast_status_update(user_id, False))
-                logger.info(f"User {user_id} disconnected. Remaining connections: {len(self.active_connections.get(user_id, set()))}")
+                logger.info("User %s disconnected. Remaining connections: %d", user_id, len(self.active_connections.get(user_id, ())))
         except Exception as e:
-            logger.error(f"Error disconnecting user {user_id}: {e}")
+            logger.error("Error disconnecting user %s: %s", user_id, e)
     
     async def send_personal_message(self, message: dict, user_id: int):
+        await self._send_text(json_dumps(message), user_id)
+
+    async def _send_text(self, text: str, user_id: int):
+        """Отправка уже сериализованного сообщения во все соединения пользователя"""
         if user_id in self.active_connections and self.active_connections[user_id]:
             dead_connections = []
             for connection in list(self.active_connections[user_id]):
                 try:
-                    await connection.send_json(message)
-                    logger.debug(f"Message sent to user {user_id}: {message}")
+                    await connection.send_text(text)
+                    logger.debug("Message sent to user %s: %s", user_id, text)
                 except Exception as e:
-                    logger.error(f"Error sending message to user {user_id}: {e}")
+                    logger.error("Error sending message to user %s: %s", user_id, e)
                     dead_connections.append(connection)
             
             # Удаляем мертвые соединения
             for connection in dead_connections:
                 self.disconnect(connection, user_id)
         else:
-            logger.debug(f"No active connections for user {user_id}")
+            logger.debug("No active connections for user %s", user_id)
     
     async def broadcast_to_users(self, message: dict, user_ids: list[int]):
+        # Сериализуем сообщение один раз для всех получателей
+        text = json_dumps(message)
         for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
+            await self._send_text(text, user_id)
     
     async def broadcast_status_update(self, user_id: int, is_online: bool):
         """Рассылка уведомления об изменении статуса пользователя"""
@@ -68,13 +83,16 @@ class ConnectionManager:
                 "timestamp": datetime.now().isoformat()
             }
             
-            # Отправляем всем пользователям, кроме самого пользователя
-            for other_user_id in self.active_connections:
+            # Отправляем всем пользователям, кроме самого пользователя.
+            # Перебираем снимок ключей: пока идут await, другие соединения
+            # могут подключаться и отключаться, изменяя active_connections
+            text = json_dumps(status_message)
+            for other_user_id in list(self.active_connections):
                 if other_user_id != user_id:
-                    await self.send_personal_message(status_message, other_user_id)
+                    await self._send_text(text, other_user_id)
             
-            logger.info(f"Broadcast status update: user {user_id} is now {'online' if is_online else 'offline'}")
+            logger.info("Broadcast status update: user %s is now %s", user_id, "online" if is_online else "offline")
         except Exception as e:
-            logger.error(f"Error broadcasting status update for user {user_id}: {e}")
+            logger.error("Error broadcasting status update for user %s: %s", user_id, e)
 
 manager = ConnectionManager()
\ No newline at end of file